@@ -0,0 +1,53 @@
+import os
+
+# Process-wide LLM response cache configuration.
+# LangChain consults the global cache on every LLM call, keyed by
+# (llm_string, prompt), so repeated prompts and task descriptions are served
+# from local storage instead of a fresh API round-trip. This module must be
+# imported (and configure_llm_cache() called) before any ChatGoogleGenerativeAI
+# instance is constructed; importing mcp.config.settings takes care of that.
+
+# Default on-disk location for the persistent cache database; override with
+# the MCP_LLM_CACHE_DB environment variable.
+DEFAULT_CACHE_DB = ".mcp_llm_cache.db"
+
+_cache_configured = False
+
+
+def configure_llm_cache(database_path=None):
+    """
+    Installs LangChain's global LLM cache (SQLite-backed, with an in-memory
+    fallback) so that repeated prompts skip the remote API entirely. Because
+    the cache is on disk, hits survive process restarts and deploys.
+
+    Safe to call multiple times; only the first call has an effect.
+    """
+    global _cache_configured
+    if _cache_configured:
+        return
+    if database_path is None:
+        database_path = os.environ.get("MCP_LLM_CACHE_DB", DEFAULT_CACHE_DB)
+
+    try:
+        from langchain.globals import set_llm_cache
+    except ImportError:
+        print("Warning: LangChain global cache API not available. LLM caching disabled.")
+        return
+
+    try:
+        try:
+            from langchain_community.cache import SQLiteCache
+        except ImportError:  # Older LangChain layouts expose caches here
+            from langchain.cache import SQLiteCache
+        set_llm_cache(SQLiteCache(database_path=database_path))
+    except Exception as e:
+        # SQLite may be unusable (e.g. read-only filesystem); fall back to an
+        # ephemeral in-process cache rather than running uncached.
+        print(f"Warning: Could not initialize SQLite LLM cache ({e}). Using in-memory cache.")
+        try:
+            from langchain_community.cache import InMemoryCache
+        except ImportError:
+            from langchain.cache import InMemoryCache
+        set_llm_cache(InMemoryCache())
+
+    _cache_configured = True
@@ -1,4 +1,6 @@
+import functools
 import os
+from types import MappingProxyType
 
 class LLMConfig:
     """
@@ -60,25 +62,50 @@ class LLMConfig:
         """
         Returns the specific model name for a given conceptual LLM type.
         """
-        config = LLMConfig.LLM_TYPE_TO_CONFIG.get(llm_type, LLMConfig.GEMINI_PRO)
-        return config["model_name"]
+        return _MODEL_NAMES.get(llm_type, _DEFAULT_MODEL_NAME)
 
     @staticmethod
+    @functools.lru_cache(maxsize=16)
     def get_api_key(llm_type: str) -> str:
         """
         Returns the API key from environment variables for a given conceptual LLM type.
+        The resolved key is cached per llm_type to avoid repeated environment lookups.
         """
-        config = LLMConfig.LLM_TYPE_TO_CONFIG.get(llm_type, LLMConfig.GEMINI_PRO)
-        api_key_env_var = config["api_key_env_var"]
+        api_key_env_var = _API_KEY_ENV_VARS.get(llm_type, _DEFAULT_API_KEY_ENV_VAR)
         return os.getenv(api_key_env_var, "") # Return empty string if not found
 
     @staticmethod
+    @functools.lru_cache(maxsize=16)
     def get_llm_description(llm_type: str) -> str:
         """
         Returns the description for a given conceptual LLM type.
+        Memoized per llm_type; the switch_mode tool resolves a description on
+        every invocation, so repeat lookups should cost a cache hit only.
         """
-        config = LLMConfig.LLM_TYPE_TO_CONFIG.get(llm_type, LLMConfig.GEMINI_PRO)
-        return config["description"]
+        return _DESCRIPTIONS.get(llm_type, _DEFAULT_DESCRIPTION)
+
+# Flat, read-only lookup tables derived from LLM_TYPE_TO_CONFIG so each
+# accessor above is a single hash lookup instead of a nested dict traversal.
+_MODEL_NAMES = MappingProxyType({k: v["model_name"] for k, v in LLMConfig.LLM_TYPE_TO_CONFIG.items()})
+_API_KEY_ENV_VARS = MappingProxyType({k: v["api_key_env_var"] for k, v in LLMConfig.LLM_TYPE_TO_CONFIG.items()})
+_DESCRIPTIONS = MappingProxyType({k: v["description"] for k, v in LLMConfig.LLM_TYPE_TO_CONFIG.items()})
+
+# Fallbacks mirror the historical behavior of defaulting to GEMINI_PRO.
+_DEFAULT_MODEL_NAME = LLMConfig.GEMINI_PRO["model_name"]
+_DEFAULT_API_KEY_ENV_VAR = LLMConfig.GEMINI_PRO["api_key_env_var"]
+_DEFAULT_DESCRIPTION = LLMConfig.GEMINI_PRO["description"]
+
+@functools.lru_cache(maxsize=8)
+def get_chat_model(model_name: str, temperature: float = 0.0):
+    """
+    Returns a shared ChatGoogleGenerativeAI client for (model_name, temperature).
+    Clients are cached so components requesting the same configuration reuse a
+    single credential setup and HTTP connection pool instead of each bringing
+    up their own.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI # Deferred so importing config stays cheap
+    return ChatGoogleGenerativeAI(model=model_name, temperature=temperature)
+
 
 # Example usage (for testing purposes)
 if __name__ == "__main__":
@@ -1,31 +1,60 @@
+import functools
 import json
 import os
+from types import MappingProxyType
 
-# Configuration settings for the MCP
-class MCPSettings:
-    _config_data = {}
-    _config_file_path = os.path.join(os.path.dirname(__file__), 'mcp.json')
+from mcp.config.llm_cache import configure_llm_cache
+
+# Install the global LLM response cache before any module constructs a
+# ChatGoogleGenerativeAI client, so repeat prompts hit the cache automatically.
+configure_llm_cache()
+
+_CONFIG_FILE_PATH = os.path.join(os.path.dirname(__file__), 'mcp.json')
+
+
+def _config_mtime() -> float:
+    try:
+        return os.path.getmtime(_CONFIG_FILE_PATH)
+    except OSError:
+        return -1.0
+
+
+@functools.lru_cache(maxsize=1)
+def _load_mcp_config_at(mtime: float) -> dict:
+    try:
+        with open(_CONFIG_FILE_PATH, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"Warning: {_CONFIG_FILE_PATH} not found. Using default settings.")
+        return {}
+    except json.JSONDecodeError:
+        print(f"Error: Could not decode JSON from {_CONFIG_FILE_PATH}. Using default settings.")
+        return {}
 
-    @classmethod
-    def load_config(cls):
-        if not cls._config_data:
-            try:
-                with open(cls._config_file_path, 'r') as f:
-                    cls._config_data = json.load(f)
-            except FileNotFoundError:
-                print(f"Warning: {cls._config_file_path} not found. Using default settings.")
-                cls._config_data = {} # Ensure it's an empty dict if file not found
-            except json.JSONDecodeError:
-                print(f"Error: Could not decode JSON from {cls._config_file_path}. Using default settings.")
-                cls._config_data = {}
 
+def _load_mcp_config() -> dict:
+    # Keyed on the file's mtime so edits to mcp.json invalidate the cached
+    # parse without re-reading the file on every lookup.
+    return _load_mcp_config_at(_config_mtime())
+
+
+def _default_llm_type() -> str:
+    # Environment override first (for 12-factor deployments), then mcp.json.
+    env_override = os.getenv("MCP_DEFAULT_LLM_TYPE")
+    if env_override:
+        return env_override
+    return _load_mcp_config().get("llm_config", {}).get("default_llm_type", "Gemini")
+
+
+# Configuration settings for the MCP
+class MCPSettings:
     @classmethod
     def get_default_llm_type(cls) -> str:
-        cls.load_config() # Ensure config is loaded
-        return cls._config_data.get("llm_config", {}).get("default_llm_type", "Gemini")
+        return _default_llm_type()
 
-    # Default LLM for general tasks (can be overridden by mcp.json)
-    LLM_MODEL_NAME: str = get_default_llm_type()
+    # Default LLM for general tasks (can be overridden by mcp.json or the
+    # MCP_DEFAULT_LLM_TYPE environment variable)
+    LLM_MODEL_NAME: str = _default_llm_type()
 
     # Mapping of task types to recommended LLM capabilities/types
     # This can be expanded with more granular task types and specific LLM recommendations
@@ -34,7 +63,9 @@ class MCPSettings:
     # Claude: Longer context, reasoning frameworks
     # Gemini: Creative tasks, comparative analysis
     # Others: Apply universal best practices
-    RECOMMENDED_LLMS_BY_TASK_TYPE = {
+    # Frozen via MappingProxyType so the recommendation table cannot be
+    # mutated accidentally at runtime.
+    RECOMMENDED_LLMS_BY_TASK_TYPE = MappingProxyType({
         "code.generate": "Gemini", # Creative tasks, good for code generation
         "code.refactor": "Gemini", # Creative tasks, good for code refactoring
         "debug.issue": "Claude", # Reasoning frameworks, good for debugging complex issues
@@ -42,9 +73,25 @@ class MCPSettings:
         "get.documentation": "ChatGPT/GPT-4", # Structured sections, good for information retrieval
         "file.create": "Others", # Simple task, universal best practices
         "default": "Gemini" # Fallback for unlisted task types
-    }
+    })
+
+    # Resolved once at class creation so lookups need a single dict access
+    # instead of re-reading the "default" entry on every miss.
+    _DEFAULT_RECOMMENDED_LLM = RECOMMENDED_LLMS_BY_TASK_TYPE["default"]
+
+    # Task-type prefixes whose target Roo Mode is fully determined. The router
+    # resolves these with a dict lookup and only falls back to LLM-based
+    # routing for genuinely unknown prefixes.
+    _TASK_PREFIX_TO_MODE = MappingProxyType({
+        "code": "code",
+        "debug": "debug",
+        "design": "architect",
+        "get": "ask",
+        "file": "code",
+        "manage": "orchestrator"
+    })
 
     # Placeholder for active LLM from VS Code.
     # In a real scenario, this would be dynamically fetched from the VS Code environment.
     # For now, it can be set manually or default to LLM_MODEL_NAME.
-    ACTIVE_ROO_CODE_LLM: str = get_default_llm_type() # This would be the actual model name if fetched
\ No newline at end of file
+    ACTIVE_ROO_CODE_LLM: str = _default_llm_type() # This would be the actual model name if fetched
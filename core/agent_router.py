@@ -2,17 +2,25 @@ from langchain.tools import Tool
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain.prompts import ChatPromptTemplate
-import json
+import asyncio
+import functools
+import logging
 from mcp.config.settings import MCPSettings
+from mcp.config.llm_config import get_chat_model
+from mcp.core import json_utils
+
+logger = logging.getLogger(__name__)
 
 # Placeholder for getting available Roo Modes.
 # In a real scenario, this would dynamically discover modes from the VS Code environment or a config file.
-def get_available_roo_modes() -> list[dict]:
+@functools.lru_cache(maxsize=1)
+def get_available_roo_modes() -> tuple[dict, ...]:
     """
-    Returns a list of dictionaries, each representing an available Roo Mode.
+    Returns a tuple of dictionaries, each representing an available Roo Mode.
     Each dictionary should contain 'slug', 'name', and 'role_definition'.
+    The result is memoized, so the catalog is built once per process.
     """
-    return [
+    return (
         {
             "slug": "code",
             "name": "💻 Code",
@@ -38,19 +46,57 @@ def get_available_roo_modes() -> list[dict]:
             "name": "🪃 Orchestrator",
             "role_definition": "The 'Orchestrator' mode for complex, multi-step projects that require coordination across different specialties. Use this for breaking down large tasks and managing workflows."
         }
-    ]
+    )
+
+# Precomputed set of valid mode slugs for O(1) membership checks during routing.
+_VALID_MODE_SLUGS = frozenset(mode["slug"] for mode in get_available_roo_modes())
+
+@functools.lru_cache(maxsize=None)
+def _slug_returner(slug: str):
+    """
+    Returns a callable that ignores its input and returns the given mode slug.
+    Cached per slug so repeated router instantiations share one function
+    object instead of allocating a fresh closure per mode each time.
+    """
+    def _return_slug(_input):
+        return slug
+    return _return_slug
 
 class AgentRouter:
     def __init__(self, llm_model_name: str = MCPSettings.LLM_MODEL_NAME):
-        self.llm = ChatGoogleGenerativeAI(model=llm_model_name, temperature=0) # Lower temperature for more deterministic routing
-        self.roo_mode_tools = self._create_roo_mode_tools()
-        self.prompt = ChatPromptTemplate.from_messages([
+        # Heavy resources (LLM client, tools, agent executor) are built lazily
+        # on first access, so constructing a router stays cheap.
+        self.llm_model_name = llm_model_name
+
+    @functools.cached_property
+    def llm(self) -> ChatGoogleGenerativeAI:
+        return get_chat_model(self.llm_model_name, temperature=0) # Lower temperature for more deterministic routing
+
+    @functools.cached_property
+    def roo_mode_tools(self) -> list[Tool]:
+        return self._create_roo_mode_tools()
+
+    @functools.cached_property
+    def _tool_names(self) -> tuple[str, ...]:
+        # The tool set is invariant after construction; compute the names once
+        # instead of rebuilding the list on every routed task.
+        return tuple(tool.name for tool in self.roo_mode_tools)
+
+    @functools.cached_property
+    def prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages([
             ("system", "You are an expert agent router. Your task is to select the most appropriate Roo Mode (tool) for a given task."),
             ("human", "Given the following task: {task}\n\nSelect the best tool from the available tools."),
             ("human", "Available tools: {tool_names}")
         ])
-        self.agent = create_tool_calling_agent(self.llm, self.roo_mode_tools, self.prompt)
-        self.agent_executor = AgentExecutor(agent=self.agent, tools=self.roo_mode_tools, verbose=False) # Set verbose to True for debugging
+
+    @functools.cached_property
+    def agent(self):
+        return create_tool_calling_agent(self.llm, self.roo_mode_tools, self.prompt)
+
+    @functools.cached_property
+    def agent_executor(self) -> AgentExecutor:
+        return AgentExecutor(agent=self.agent, tools=self.roo_mode_tools, verbose=False) # Set verbose to True for debugging
 
     def _create_roo_mode_tools(self) -> list[Tool]:
         """
@@ -62,7 +108,7 @@ class AgentRouter:
             # The AgentRouter's job is just to select the correct tool (mode slug).
             tool = Tool(
                 name=mode["slug"],
-                func=lambda x, slug=mode["slug"]: slug, # Return the slug directly
+                func=_slug_returner(mode["slug"]), # Return the slug directly
                 description=mode["role_definition"]
             )
             tools.append(tool)
@@ -80,25 +126,63 @@ class AgentRouter:
             dict: A dictionary containing the selected mode slug and the recommended LLM type.
                   Example: {"mode_slug": "code", "recommended_llm": "Gemini"}
         """
+        task_type = task.get('task_type', 'default')
+        recommended_llm = MCPSettings.RECOMMENDED_LLMS_BY_TASK_TYPE.get(task_type, MCPSettings._DEFAULT_RECOMMENDED_LLM)
+
+        # Deterministic fast path: well-known task-type prefixes map directly
+        # to a mode, so there is nothing for the routing LLM to rediscover.
+        prefix = task_type.split(".", 1)[0]
+        mode_slug = MCPSettings._TASK_PREFIX_TO_MODE.get(prefix)
+        if mode_slug is not None:
+            return {"mode_slug": mode_slug, "recommended_llm": recommended_llm}
+
         try:
-            task_type = task.get('task_type', 'default')
-            recommended_llm = MCPSettings.RECOMMENDED_LLMS_BY_TASK_TYPE.get(task_type, MCPSettings.RECOMMENDED_LLMS_BY_TASK_TYPE["default"])
-
-            task_description = f"Task Type: {task_type}\nParams: {json.dumps(task.get('params', {}))}"
-            
-            result = self.agent_executor.invoke({"task": task_description, "tool_names": [tool.name for tool in self.roo_mode_tools]})
-            
-            selected_mode_slug = result.get("output")
-            
-            if selected_mode_slug and selected_mode_slug in [mode["slug"] for mode in get_available_roo_modes()]:
-                return {"mode_slug": selected_mode_slug, "recommended_llm": recommended_llm}
-            else:
-                print(f"Agent Router failed to select a valid mode. Result: {result}")
-                return {"mode_slug": "orchestrator", "recommended_llm": recommended_llm} # Fallback
+            # Normalized fingerprint of the params so equivalent tasks share a cache entry.
+            params_key = json_utils.dumps(task.get('params', {}), sort_keys=True)
+            mode_slug = self._route_task_cached(task_type, params_key)
+            return {"mode_slug": mode_slug, "recommended_llm": recommended_llm}
         except Exception as e:
-            print(f"An unexpected error occurred during agent routing: {e}")
+            logger.error("Unexpected error during agent routing: %s", e)
             return {"mode_slug": "orchestrator", "recommended_llm": recommended_llm} # Fallback
 
+    async def aroute_tasks(self, tasks: list[dict]) -> list[dict]:
+        """
+        Routes many tasks concurrently. Deterministic and cached routes
+        resolve immediately; at most 8 LLM-backed routings are in flight at a
+        time. Results are returned in input order.
+        """
+        semaphore = asyncio.Semaphore(8)
+
+        async def _route_one(task: dict) -> dict:
+            async with semaphore:
+                # route_task keeps the fast-path/cache/fallback logic in one
+                # place; run it off the event loop so routings overlap.
+                return await asyncio.to_thread(self.route_task, task)
+
+        return list(await asyncio.gather(*(_route_one(task) for task in tasks)))
+
+    @functools.lru_cache(maxsize=1024)
+    def _route_task_cached(self, task_type: str, params_key: str) -> str:
+        """
+        Selects the Roo Mode for a (task_type, params) fingerprint via the tool-calling agent.
+        Results are memoized, so repeated task shapes skip the LLM round-trip entirely.
+        """
+        task_description = f"Task Type: {task_type}\nParams: {params_key}"
+
+        result = self.agent_executor.invoke({"task": task_description, "tool_names": self._tool_names})
+
+        selected_mode_slug = result.get("output")
+
+        if selected_mode_slug and selected_mode_slug in _VALID_MODE_SLUGS:
+            return selected_mode_slug
+        else:
+            logger.warning("Agent Router failed to select a valid mode; falling back to orchestrator.")
+            # The agent result can run to kilobytes; only serialize it when
+            # someone is actually reading DEBUG output.
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Agent Router raw result: %s", result)
+            return "orchestrator" # Fallback
+
 if __name__ == "__main__":
     router = AgentRouter()
 
@@ -0,0 +1,35 @@
+import json
+
+# Shared JSON helpers for the MCP core modules.
+# orjson parses and serializes severalfold faster than the stdlib json module;
+# when it is not installed these helpers fall back to json transparently.
+# Decode failures raise ValueError in both cases (json.JSONDecodeError and
+# orjson.JSONDecodeError are ValueError subclasses), so callers can catch
+# ValueError regardless of the backend.
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+def dumps(obj, indent: bool = False, sort_keys: bool = False) -> str:
+    """
+    Serializes obj to a JSON string, using orjson when available.
+    """
+    if _orjson is not None:
+        option = 0
+        if indent:
+            option |= _orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= _orjson.OPT_SORT_KEYS
+        return _orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, sort_keys=sort_keys)
+
+
+def loads(data):
+    """
+    Parses a JSON string (or bytes), using orjson when available.
+    """
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
@@ -1,13 +1,17 @@
 from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain.prompts import ChatPromptTemplate
 from langchain.tools import Tool
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationTokenBufferMemory
 from langchain_google_genai import ChatGoogleGenerativeAI # Import here for dynamic model loading
+import asyncio
+import contextvars
+import functools
 import json
 
 from mcp.config.settings import MCPSettings
-from mcp.config.llm_config import LLMConfig # Import LLMConfig
+from mcp.config.llm_config import LLMConfig, get_chat_model # Import LLMConfig
 from mcp.core.agent_router import get_available_roo_modes, AgentRouter
+from mcp.core import json_utils
 
 # Custom Tool for `switch_mode`
 # In a real VS Code extension, this would trigger the actual VS Code command.
@@ -25,6 +29,11 @@ def _switch_mode_tool_func(mode_slug: str, message: str = "", recommended_llm_ty
     # For now, we'll just return a success message.
     return f"Successfully requested mode switch to {mode_slug}. Recommended LLM: {recommended_llm_type}. Waiting for task completion..."
 
+# The task currently being executed by execute_plan, published per asyncio
+# context so the per-mode delegation tools can read the dict directly instead
+# of re-parsing the JSON string the agent hands them.
+_CURRENT_TASK: contextvars.ContextVar = contextvars.ContextVar("mcp_current_task", default=None)
+
 switch_mode_tool = Tool(
     name="switch_mode",
     func=_switch_mode_tool_func,
@@ -35,17 +44,41 @@ switch_mode_tool = Tool(
 
 class OrchestrationEngine:
     def __init__(self):
-        # Load default LLM type from MCPSettings
-        default_llm_type = MCPSettings.get_default_llm_type()
-        self.llm = ChatGoogleGenerativeAI(model=LLMConfig.get_llm_model_name(default_llm_type), temperature=0.2)
-        self.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-        self.agent_router = AgentRouter(llm_model_name=LLMConfig.get_llm_model_name(default_llm_type)) # Initialize AgentRouter with default LLM
+        # Load default LLM type from MCPSettings; the heavy LangChain objects
+        # (LLM client, router, agent executor) are built lazily on first use.
+        self.default_llm_type = MCPSettings.get_default_llm_type()
+
+    @functools.cached_property
+    def llm(self) -> ChatGoogleGenerativeAI:
+        return get_chat_model(LLMConfig.get_llm_model_name(self.default_llm_type), temperature=0.2)
+
+    @functools.cached_property
+    def memory(self) -> ConversationTokenBufferMemory:
+        # Token-bounded so chat_history stops growing linearly with plan
+        # length; otherwise every subsequent task ships an ever-larger prompt.
+        return ConversationTokenBufferMemory(
+            llm=self.llm,
+            max_token_limit=1500,
+            memory_key="chat_history",
+            return_messages=True
+        )
 
+    @functools.cached_property
+    def agent_router(self) -> AgentRouter:
+        return AgentRouter(llm_model_name=LLMConfig.get_llm_model_name(self.default_llm_type)) # Initialize AgentRouter with default LLM
+
+    @functools.cached_property
+    def roo_mode_tools(self) -> list[Tool]:
         # Get available Roo Modes and create LangChain Tools for them
-        self.roo_mode_tools = self._create_roo_mode_tools()
-        self.all_tools = self.roo_mode_tools + [switch_mode_tool]
+        return self._create_roo_mode_tools()
+
+    @functools.cached_property
+    def all_tools(self) -> list[Tool]:
+        return self.roo_mode_tools + [switch_mode_tool]
 
-        self.prompt = ChatPromptTemplate.from_messages([
+    @functools.cached_property
+    def prompt(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages([
             ("system", "You are the Master Control Program (MCP) Orchestration Engine. "
                        "Your goal is to execute a sequence of tasks by delegating them to appropriate Roo Modes. "
                        "Use the 'switch_mode' tool to delegate tasks to specific modes. "
@@ -55,8 +88,13 @@ class OrchestrationEngine:
             ("placeholder", "{agent_scratchpad}")
         ])
 
-        self.agent = create_tool_calling_agent(self.llm, self.all_tools, self.prompt)
-        self.agent_executor = AgentExecutor(
+    @functools.cached_property
+    def agent(self):
+        return create_tool_calling_agent(self.llm, self.all_tools, self.prompt)
+
+    @functools.cached_property
+    def agent_executor(self) -> AgentExecutor:
+        return AgentExecutor(
             agent=self.agent,
             tools=self.all_tools,
             memory=self.memory,
@@ -74,15 +112,22 @@ class OrchestrationEngine:
             # The func for these tools will be to call the actual `switch_mode_tool`
             # with the appropriate mode slug and task details.
             def _delegate_to_mode(task_details: str, mode_slug=mode["slug"]):
-                # When delegating, we need to get the recommended LLM for this specific task.
-                # This requires calling the AgentRouter.
-                task_dict = json.loads(task_details) # Convert task_details string back to dict
-                routed_info = self.agent_router.route_task(task_dict) # Use the router to get LLM recommendation
-                
+                # Prefer the task dict published by execute_plan for this
+                # context; fall back to parsing the agent-provided JSON string.
+                task_dict = _CURRENT_TASK.get()
+                if task_dict is None:
+                    task_dict = json_utils.loads(task_details) # Convert task_details string back to dict
+
+                # The recommended LLM is a pure function of the task type, so
+                # resolve it from the settings table directly instead of
+                # nesting an AgentRouter round-trip inside the delegation.
+                task_type = task_dict.get('task_type', 'default')
+                recommended_llm = MCPSettings.RECOMMENDED_LLMS_BY_TASK_TYPE.get(task_type, MCPSettings._DEFAULT_RECOMMENDED_LLM)
+
                 return _switch_mode_tool_func(
                     mode_slug,
                     message=f"Delegating task: {task_dict.get('task_type', 'N/A')} - {task_dict.get('params', {})}",
-                    recommended_llm_type=routed_info.get("recommended_llm", "N/A")
+                    recommended_llm_type=recommended_llm
                 )
 
             tool = Tool(
@@ -95,26 +140,40 @@ class OrchestrationEngine:
             tools.append(tool)
         return tools
 
-    def execute_plan(self, tasks: list[dict]) -> dict:
+    async def execute_plan(self, tasks: list[dict]) -> dict:
         """
         Executes a plan of tasks by delegating to appropriate Roo Modes.
 
+        Independent tasks are dispatched concurrently via asyncio.gather, so N
+        LLM round-trips overlap instead of running back-to-back. A task may
+        declare "dependencies": [indices of earlier tasks] to be held back
+        until those tasks have finished; tasks without dependencies all start
+        immediately. Results are returned in plan order regardless of
+        completion order.
+
         Args:
             tasks (list[dict]): A list of task dictionaries generated by TaskDecomposition.
 
         Returns:
             dict: The aggregated result of all executed tasks.
         """
-        final_results = {"status": "success", "results": []}
-        for i, task in enumerate(tasks):
-            print(f"\n--- Executing Task {i+1}/{len(tasks)}: {task.get('task_type', 'N/A')} ---")
-            task_input_str = json.dumps(task)
+        done_events = [asyncio.Event() for _ in tasks]
+
+        async def _run_one(index: int, task: dict) -> dict:
+            # Hold back until declared dependencies (indices into the plan) finish.
+            for dep in task.get("dependencies", []):
+                if isinstance(dep, int) and 0 <= dep < len(tasks) and dep != index:
+                    await done_events[dep].wait()
+            print(f"\n--- Executing Task {index+1}/{len(tasks)}: {task.get('task_type', 'N/A')} ---")
+            # Publish the task dict for the delegation tools in this context.
+            _CURRENT_TASK.set(task)
+            task_input_str = json_utils.dumps(task)
             try:
                 # The agent executor will decide which tool (Roo Mode) to call based on the task.
                 # We provide the task as the input to the agent.
                 # The agent's prompt will guide it to use the appropriate tool.
-                result = self.agent_executor.invoke({"input": f"Execute the following task: {task_input_str}"})
-                
+                result = await self.agent_executor.ainvoke({"input": f"Execute the following task: {task_input_str}"})
+
                 # In a real system, the result would come back from the switched mode.
                 # Here, we're getting the output of the simulated switch_mode_tool.
                 task_result = {
@@ -122,27 +181,35 @@ class OrchestrationEngine:
                     "status": "completed",
                     "output": result.get("output", "No specific output from simulated mode.")
                 }
-                final_results["results"].append(task_result)
-                print(f"Task {i+1} completed. Output: {task_result['output']}")
-
-                # Simulate task completion signal from the Roo Mode back to MCP
-                # In a real system, this would be an external event.
-                self.memory.save_context(
-                    {"input": f"Task {task.get('task_type', 'N/A')} delegated to {result.get('output', 'unknown mode')}."},
-                    {"output": f"Task {task.get('task_type', 'N/A')} completed successfully by {result.get('output', 'unknown mode')}."}
-                )
-
+                print(f"Task {index+1} completed. Output: {task_result['output']}")
             except Exception as e:
-                print(f"Error executing task {i+1}: {e}")
+                print(f"Error executing task {index+1}: {e}")
                 task_result = {
                     "task": task,
                     "status": "failed",
                     "error": str(e)
                 }
-                final_results["results"].append(task_result)
+            finally:
+                # Always signal completion so dependent tasks are never deadlocked.
+                done_events[index].set()
+            return task_result
+
+        results = await asyncio.gather(*(_run_one(i, task) for i, task in enumerate(tasks)))
+
+        final_results = {"status": "success", "results": list(results)}
+        for task_result in results:
+            task = task_result["task"]
+            if task_result["status"] == "failed":
                 final_results["status"] = "partial_success_with_errors"
-                # Continue to next task or break, depending on error handling strategy
-                break # For now, break on first error
+                continue
+            # Simulate task completion signal from the Roo Mode back to MCP.
+            # In a real system, this would be an external event. Memory updates
+            # are serialized here, after the gather, to avoid concurrent writes.
+            mode_output = task_result.get("output", "unknown mode")
+            self.memory.save_context(
+                {"input": f"Task {task.get('task_type', 'N/A')} delegated to {mode_output}."},
+                {"output": f"Task {task.get('task_type', 'N/A')} completed successfully by {mode_output}."}
+            )
 
         return final_results
 
@@ -159,6 +226,6 @@ if __name__ == "__main__":
     ]
 
     print("Starting Orchestration Engine with example tasks...")
-    overall_result = orchestrator.execute_plan(example_tasks)
+    overall_result = asyncio.run(orchestrator.execute_plan(example_tasks))
     print("\n--- Overall Orchestration Result ---")
     print(json.dumps(overall_result, indent=2))
\ No newline at end of file
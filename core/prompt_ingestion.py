@@ -1,13 +1,18 @@
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+from langchain_core.output_parsers import JsonOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
+import functools
+import logging
+from mcp.config.settings import MCPSettings
 from mcp.config.llm_config import LLMConfig # Import LLMConfig
 
+logger = logging.getLogger(__name__)
+
 class PromptIngestion:
     def __init__(self):
-        # Load default LLM type from MCPSettings
-        llm_type = MCPSettings.get_default_llm_type()
-        self.llm = ChatGoogleGenerativeAI(model=LLMConfig.get_llm_model_name(lllm_type))
+        # Load default LLM type from MCPSettings; the LLM client and chain are
+        # built lazily on first use.
+        self.llm_type = MCPSettings.get_default_llm_type()
         self.prompt_template = PromptTemplate(
             input_variables=["prompt"],
             template="""
@@ -33,7 +38,18 @@ class PromptIngestion:
             Output:
             """
         )
-        self.llm_chain = LLMChain(prompt=self.prompt_template, llm=self.llm)
+
+    @functools.cached_property
+    def llm(self) -> ChatGoogleGenerativeAI:
+        return ChatGoogleGenerativeAI(model=LLMConfig.get_llm_model_name(self.llm_type))
+
+    @functools.cached_property
+    def chain(self):
+        # LCEL pipeline (prompt | llm | parser): leaner per call than the
+        # deprecated LLMChain, returns a parsed dict directly (the parser
+        # strips markdown fences and surrounding prose), and supports
+        # .batch()/.abatch() for bulk ingestion.
+        return self.prompt_template | self.llm | JsonOutputParser()
 
     def ingest_prompt(self, prompt: str) -> dict:
         """
@@ -46,14 +62,11 @@ class PromptIngestion:
             dict: A structured dictionary containing the intent, entities, and original prompt.
         """
         try:
-            response = self.llm_chain.run(prompt=prompt)
-            # Attempt to parse the response as JSON.
-            # The LLM is prompted to output JSON, but robust parsing is needed.
-            import json
-            return json.loads(response)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from LLM response: {e}")
-            print(f"LLM Response: {response}")
+            return self.chain.invoke({"prompt": prompt})
+        except ValueError as e: # OutputParserException subclasses ValueError
+            # Lazy %s formatting: the message is only rendered if a handler
+            # accepts the record, so this path stays cheap in steady state.
+            logger.warning("Error decoding JSON from LLM response: %s", e)
             # Fallback or error handling if LLM doesn't return valid JSON
             return {
                 "intent": "unknown",
@@ -62,7 +75,7 @@ class PromptIngestion:
                 "error": "JSON parsing failed"
             }
         except Exception as e:
-            print(f"An unexpected error occurred during prompt ingestion: {e}")
+            logger.error("Unexpected error during prompt ingestion: %s", e)
             return {
                 "intent": "unknown",
                 "entities": {},
@@ -70,6 +83,38 @@ class PromptIngestion:
                 "error": str(e)
             }
 
+    def ingest_prompts(self, prompts: list[str]) -> list[dict]:
+        """
+        Ingests multiple raw prompts in one call, dispatching up to 8 LLM
+        requests concurrently through the chain's batch API.
+
+        Args:
+            prompts (list[str]): The raw user prompts.
+
+        Returns:
+            list[dict]: One structured result per prompt, in input order.
+                        Failed prompts yield the same fallback dict as
+                        ingest_prompt.
+        """
+        results = self.chain.batch(
+            [{"prompt": p} for p in prompts],
+            config={"max_concurrency": 8},
+            return_exceptions=True
+        )
+        ingested = []
+        for prompt, result in zip(prompts, results):
+            if isinstance(result, Exception):
+                logger.error("Unexpected error during prompt ingestion: %s", result)
+                ingested.append({
+                    "intent": "unknown",
+                    "entities": {},
+                    "original_prompt": prompt,
+                    "error": str(result)
+                })
+            else:
+                ingested.append(result)
+        return ingested
+
 if __name__ == "__main__":
     # Example Usage
     ingestor = PromptIngestion() # No need to pass llm_type anymore
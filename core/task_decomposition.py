@@ -1,39 +1,389 @@
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain_google_genai import ChatGoogleGenerativeAI
-import json
-from mcp.config.llm_config import LLMConfig # Import LLMConfig
+from pydantic import BaseModel, Field
+import asyncio
+import hashlib
+import logging
+import sys
+import textwrap
+from mcp.config.llm_config import LLMConfig, get_chat_model # Import LLMConfig
+from mcp.config.llm_cache import configure_llm_cache
+from mcp.core import json_utils
+
+# Ensure the persistent process-global LLM cache is installed before the first
+# chain call, even when this module is used without importing
+# mcp.config.settings. Exact prompt repeats then skip tokenization and network
+# work entirely, across process restarts.
+configure_llm_cache()
+
+logger = logging.getLogger(__name__)
+
+class Task(BaseModel):
+    """A single executable subtask produced by decomposition."""
+    task_type: str
+    params: dict = Field(default_factory=dict)
+
+class TaskList(BaseModel):
+    """Structured-output schema for a full decomposition."""
+    tasks: list[Task]
+
+# Rule-based decomposers for intents whose task list is a mechanical
+# transformation of the extracted entities. Each rule returns the task list,
+# or None when the required entities are missing and the LLM should decide.
+def _canonical(value):
+    """
+    Recursively normalizes a JSON-like value for cache-key hashing: runs of
+    whitespace inside strings are collapsed so cosmetically different but
+    equivalent inputs hash alike. Key ordering is handled by sort_keys at
+    serialization time.
+    """
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_canonical(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def _intern_task(task: dict) -> dict:
+    """
+    Interns a task's task_type and params keys. Decompositions repeat the same
+    small vocabulary of strings ("file.create", "path", ...) across requests;
+    interning collapses the duplicates to one heap object apiece and lets
+    downstream dict lookups compare by pointer.
+    """
+    if "task_type" in task:
+        task["task_type"] = sys.intern(task["task_type"])
+    params = task.get("params")
+    if isinstance(params, dict):
+        task["params"] = {sys.intern(k): v for k, v in params.items()}
+    return task
+
+
+def _intern_tasks(tasks: list[dict]) -> list[dict]:
+    """
+    Applies _intern_task to every task in a freshly parsed decomposition.
+    """
+    for task in tasks:
+        _intern_task(task)
+    return tasks
+
+
+# Task-type prefixes the execution layer understands beyond the tool slugs
+# themselves; mirrors the prefix routing table in MCPSettings.
+_KNOWN_TASK_PREFIXES = frozenset({"code", "debug", "design", "file", "get", "manage"})
+
+
+def _valid_task_prefixes(available_tools: list[dict]) -> frozenset:
+    """
+    Builds the set of acceptable task_type prefixes for a tool catalog: the
+    tool slugs plus the well-known prefixes above.
+    """
+    slugs = {tool.get("slug") or tool.get("name", "") for tool in available_tools}
+    slugs.discard("")
+    return frozenset(slugs) | _KNOWN_TASK_PREFIXES
+
+
+def _invalid_task_types(tasks, valid_prefixes) -> list[str]:
+    """
+    Returns the sorted distinct task_types whose prefix (the part before the
+    first '.') matches no available tool. The "error" sentinel is always valid.
+    """
+    return sorted({
+        task.task_type for task in tasks
+        if task.task_type != "error"
+        and task.task_type.split(".", 1)[0] not in valid_prefixes
+    })
+
+
+def _rule_create_file(request: dict):
+    entities = request.get("entities", {})
+    path = entities.get("filename") or entities.get("file_path") or entities.get("path")
+    if not path:
+        return None
+    params = {"path": path}
+    if "language" in entities:
+        params["language"] = entities["language"]
+    if "content_description" in entities:
+        params["prompt"] = entities["content_description"]
+    return [{"task_type": "file.create", "params": params}]
+
+
+def _rule_refactor_code(request: dict):
+    entities = request.get("entities", {})
+    target = entities.get("file_path") or entities.get("filename")
+    if not target:
+        return None
+    params = {"target_file": target}
+    if "function_name" in entities:
+        params["function_name"] = entities["function_name"]
+    return [{"task_type": "code.refactor", "params": params}]
+
+
+# The decomposition prompt is constant, so the templates are compiled once at
+# module load instead of once per TaskDecomposition instance. Every prompt
+# character is billed and adds prefill latency, so the template is dedented
+# and the worked example lives in a separate opt-in variant.
+_DECOMP_TEMPLATE = textwrap.dedent("""\
+    You are an AI assistant responsible for breaking down a user's request into a sequence of smaller, executable subtasks.
+    The request is provided as a JSON object containing "intent" and "entities".
+    You also have a list of "available_tools" which represent the capabilities of different agents (Roo Modes).
+    Your goal is to generate a list of task dictionaries, where each dictionary represents a step to be executed by a specific agent mode.
+    Each task dictionary should have at least "task_type" and "params".
+    The "task_type" should correspond to an action that can be performed by one of the available tools.
+    The "params" should contain all necessary information for that task.
+
+    Available Tools (Roo Modes):
+    {available_tools}
+
+    User Request:
+    {request}
+
+    Output a JSON list of task dictionaries. Ensure the output is valid JSON.""")
+
+_DECOMP_PROMPT = PromptTemplate(
+    input_variables=["request", "available_tools"],
+    template=_DECOMP_TEMPLATE
+)
+
+class _IncrementalTaskParser:
+    """
+    Extracts complete top-level {...} objects from a JSON array as its text
+    arrives in chunks. String and escape state is tracked so braces inside
+    string values don't confuse the depth count.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._collecting = False
+
+    def feed(self, text: str):
+        """
+        Yields each task dict whose closing brace arrives in this chunk.
+        """
+        for ch in text:
+            if self._collecting:
+                self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                if not self._collecting:
+                    self._collecting = True
+                    self._buffer = ['{']
+                self._depth += 1
+            elif ch == '}' and self._collecting:
+                self._depth -= 1
+                if self._depth == 0:
+                    obj = ''.join(self._buffer)
+                    self._collecting = False
+                    self._buffer = []
+                    try:
+                        yield json_utils.loads(obj)
+                    except ValueError:
+                        logger.warning("Skipping malformed streamed task object: %.200s", obj)
+
+
+_DECOMP_PROMPT_WITH_EXAMPLE = PromptTemplate(
+    input_variables=["request", "available_tools"],
+    template=_DECOMP_TEMPLATE + '\n\nExample Output:\n[{{"task_type": "file.create", "params": {{"path": "index.html", "content": "..."}}}}, {{"task_type": "code.generate", "params": {{"target_file": "script.js", "prompt": "..."}}}}]'
+)
+
 
 class TaskDecomposition:
-    def __init__(self, llm_type: str = "Gemini"): # Use LLM type for initialization
-        self.llm = ChatGoogleGenerativeAI(model=LLMConfig.get_llm_model_name(llm_type))
-        self.prompt_template = PromptTemplate(
-            input_variables=["request", "available_tools"],
-            template="""
-            You are an AI assistant responsible for breaking down a user's request into a sequence of smaller, executable subtasks.
-            The request is provided as a JSON object containing "intent" and "entities".
-            You also have a list of "available_tools" which represent the capabilities of different agents (Roo Modes).
-            Your goal is to generate a list of task dictionaries, where each dictionary represents a step to be executed by a specific agent mode.
-            Each task dictionary should have at least "task_type" and "params".
-            The "task_type" should correspond to an action that can be performed by one of the available tools.
-            The "params" should contain all necessary information for that task.
-
-            Available Tools (Roo Modes):
-            {available_tools}
-
-            User Request:
-            {request}
-
-            Output a JSON list of task dictionaries. Ensure the output is valid JSON.
-
-            Example Output:
-            [
-              {{"task_type": "file.create", "params": {{"path": "index.html", "content": "..."}}}},
-              {{"task_type": "code.generate", "params": {{"target_file": "script.js", "prompt": "..."}}}}
-            ]
-            """
+    # Decomposition results shared across instances, keyed by a fingerprint of
+    # (llm_type, canonical request, sorted tool slugs). Repeated or equivalent
+    # requests short-circuit the LLM call entirely.
+    _cache: dict[str, list[dict]] = {}
+
+    # Decomposition chains shared across instances, one per llm_type, so
+    # per-request construction of TaskDecomposition does not rebuild the
+    # client or recompile the chain.
+    _chains: dict = {}
+
+    # Escalation telemetry for tuning the fast tier: how many LLM-backed
+    # decompositions ran, and how many had to escalate to the strong model.
+    _decomposition_count = 0
+    _escalation_count = 0
+
+    def __init__(self, llm_type: str = "Gemini", include_example: bool = False,
+                 tier: str = "fast"): # Use LLM type for initialization
+        self.llm_type = llm_type
+        self.llm = get_chat_model(LLMConfig.get_llm_model_name(llm_type))
+        self.prompt_template = _DECOMP_PROMPT_WITH_EXAMPLE if include_example else _DECOMP_PROMPT
+        if tier == "fast":
+            # Cost-aware tiering: decomposition is structured work a fast
+            # model handles well, so run Flash for the common path and
+            # escalate to the type's configured model only when the result
+            # fails validation.
+            self.chain = self._get_chain(LLMConfig.GEMINI_1_5_FLASH["model_name"], include_example, self.prompt_template)
+            self._escalation_chain = self._get_chain(LLMConfig.get_llm_model_name(llm_type), include_example, self.prompt_template)
+        else:
+            self.chain = self._get_chain(LLMConfig.get_llm_model_name(llm_type), include_example, self.prompt_template)
+            self._escalation_chain = None
+        # (id of last tool catalog, its serialized form) — see _tools_str.
+        self._tools_cache: tuple = (None, None)
+        # Intents decomposable without an LLM call; see the module-level rules.
+        self._rules = {
+            "create_file": _rule_create_file,
+            "refactor_code": _rule_refactor_code,
+        }
+
+    def _apply_rule(self, request: dict):
+        """
+        Returns the rule-based decomposition for the request's intent, or None
+        when no rule applies and the LLM chain should run.
+        """
+        rule = self._rules.get(request.get("intent"))
+        if rule is None:
+            return None
+        return rule(request)
+
+    @classmethod
+    def _get_chain(cls, model_name: str, include_example: bool, prompt_template: PromptTemplate):
+        """
+        Returns the shared decomposition chain for (model_name, include_example),
+        building it on first use. Gemini's structured-output mode guarantees a
+        schema-conforming TaskList, and the underlying client comes from
+        get_chat_model, so all instances using a model share one connection pool.
+        """
+        key = (model_name, include_example)
+        chain = cls._chains.get(key)
+        if chain is None:
+            llm = get_chat_model(model_name)
+            chain = prompt_template | llm.with_structured_output(TaskList)
+            cls._chains[key] = chain
+        return chain
+
+    @staticmethod
+    def _needs_escalation(result) -> bool:
+        # An empty or missing task list from the fast tier is treated as a
+        # failed decomposition worth retrying on the strong model.
+        return result is None or not result.tasks
+
+    def _invoke_structured(self, inputs: dict) -> TaskList:
+        type(self)._decomposition_count += 1
+        result = self.chain.invoke(inputs)
+        if self._needs_escalation(result):
+            if self._escalation_chain is not None and self._escalation_chain is not self.chain:
+                type(self)._escalation_count += 1
+                logger.info("Escalating decomposition from the fast tier to the strong model (%d/%d escalated).",
+                            self._escalation_count, self._decomposition_count)
+                result = self._escalation_chain.invoke(inputs)
+            elif result is None:
+                # One bounded retry: structured-output misses are usually transient.
+                logger.warning("Structured decomposition returned no result; retrying once.")
+                result = self.chain.invoke(inputs)
+        if result is None:
+            raise ValueError("structured output returned no result")
+        return result
+
+    async def _ainvoke_structured(self, inputs: dict) -> TaskList:
+        type(self)._decomposition_count += 1
+        result = await self.chain.ainvoke(inputs)
+        if self._needs_escalation(result):
+            if self._escalation_chain is not None and self._escalation_chain is not self.chain:
+                type(self)._escalation_count += 1
+                logger.info("Escalating decomposition from the fast tier to the strong model (%d/%d escalated).",
+                            self._escalation_count, self._decomposition_count)
+                result = await self._escalation_chain.ainvoke(inputs)
+            elif result is None:
+                # One bounded retry: structured-output misses are usually transient.
+                logger.warning("Structured decomposition returned no result; retrying once.")
+                result = await self.chain.ainvoke(inputs)
+        if result is None:
+            raise ValueError("structured output returned no result")
+        return result
+
+    @staticmethod
+    def _correction_inputs(inputs: dict, invalid: list[str], valid_prefixes) -> dict:
+        correction = (
+            "\n\nA previous attempt used invalid task_types: "
+            + ", ".join(invalid)
+            + ". Re-emit the full task list using only task_types whose prefix"
+            " (the part before the first '.') is one of: "
+            + ", ".join(sorted(valid_prefixes)) + "."
         )
-        self.llm_chain = LLMChain(prompt=self.prompt_template, llm=self.llm)
+        return {**inputs, "request": inputs["request"] + correction}
+
+    def _validated(self, result: TaskList, inputs: dict, available_tools: list[dict]) -> TaskList:
+        """
+        Checks returned task_types against the tool catalog locally, so bad
+        plans are caught here instead of at execution time. On a miss, one
+        targeted retry names the offending task_types; anything still invalid
+        after that is dropped with a warning rather than triggering a full
+        re-decomposition downstream.
+        """
+        valid = _valid_task_prefixes(available_tools)
+        invalid = _invalid_task_types(result.tasks, valid)
+        if not invalid:
+            return result
+        logger.warning("Decomposition produced invalid task_types %s; retrying with correction.", invalid)
+        result = self._invoke_structured(self._correction_inputs(inputs, invalid, valid))
+        still_invalid = _invalid_task_types(result.tasks, valid)
+        if still_invalid:
+            logger.warning("Dropping tasks with invalid task_types after retry: %s", still_invalid)
+            result = TaskList(tasks=[
+                task for task in result.tasks
+                if task.task_type == "error" or task.task_type.split(".", 1)[0] in valid
+            ])
+        return result
+
+    async def _avalidated(self, result: TaskList, inputs: dict, available_tools: list[dict]) -> TaskList:
+        """
+        Async counterpart of _validated, sharing its retry-once-then-drop policy.
+        """
+        valid = _valid_task_prefixes(available_tools)
+        invalid = _invalid_task_types(result.tasks, valid)
+        if not invalid:
+            return result
+        logger.warning("Decomposition produced invalid task_types %s; retrying with correction.", invalid)
+        result = await self._ainvoke_structured(self._correction_inputs(inputs, invalid, valid))
+        still_invalid = _invalid_task_types(result.tasks, valid)
+        if still_invalid:
+            logger.warning("Dropping tasks with invalid task_types after retry: %s", still_invalid)
+            result = TaskList(tasks=[
+                task for task in result.tasks
+                if task.task_type == "error" or task.task_type.split(".", 1)[0] in valid
+            ])
+        return result
+
+    def _tools_str(self, available_tools: list[dict]) -> str:
+        """
+        Serializes the tool catalog for the prompt, reusing the previous
+        serialization while the same catalog object is passed in. The catalog
+        changes rarely, and keeping its text byte-identical at the prompt's
+        stable prefix position also lets provider-side prompt-prefix caching
+        reuse the prefill for the tools block across calls.
+        """
+        catalog_id = id(available_tools)
+        if self._tools_cache[0] != catalog_id:
+            self._tools_cache = (catalog_id, json_utils.dumps(available_tools))
+        return self._tools_cache[1]
+
+    def _cache_key(self, request: dict, available_tools: list[dict]) -> str:
+        """
+        Builds a stable fingerprint for a (request, tool set) pair. Tool slugs
+        are sorted, dict keys are canonicalized by sorted serialization, and
+        string values have their whitespace collapsed, so equivalent inputs
+        hash alike. original_prompt is excluded from the hash — its free-form
+        text varies between otherwise identical requests — but it still goes
+        to the LLM as part of the prompt.
+        """
+        tool_slugs = sorted(tool.get("slug", tool.get("name", "")) for tool in available_tools)
+        hashed_request = {k: v for k, v in request.items() if k != "original_prompt"}
+        payload = json_utils.dumps([self.llm_type, _canonical(hashed_request), tool_slugs], sort_keys=True)
+        return hashlib.blake2b(payload.encode()).hexdigest()
 
     def decompose_request(self, request: dict, available_tools: list[dict]) -> list[dict]:
         """
@@ -46,21 +396,140 @@ class TaskDecomposition:
         Returns:
             list[dict]: A list of task dictionaries.
         """
+        rule_tasks = self._apply_rule(request)
+        if rule_tasks is not None:
+            return rule_tasks
+
+        cache_key = self._cache_key(request, available_tools)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
         try:
             # Convert available_tools to a string format suitable for the prompt
-            tools_str = json.dumps(available_tools, indent=2)
-            request_str = json.dumps(request, indent=2)
-
-            response = self.llm_chain.run(request=request_str, available_tools=tools_str)
-            return json.loads(response)
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from LLM response in TaskDecomposition: {e}")
-            print(f"LLM Response: {response}")
-            return [{"task_type": "error", "params": {"message": "Failed to decompose request: Invalid JSON from LLM"}}]
+            tools_str = self._tools_str(available_tools)
+            request_str = json_utils.dumps(request)
+
+            inputs = {"request": request_str, "available_tools": tools_str}
+            result = self._validated(self._invoke_structured(inputs), inputs, available_tools)
+            tasks = _intern_tasks([task.model_dump() for task in result.tasks])
+            # Only successful decompositions are cached; error fallbacks below
+            # should stay retryable.
+            self._cache[cache_key] = tasks
+            return tasks
+        except ValueError as e: # Covers pydantic validation and decode errors alike
+            logger.warning("Invalid structured output in TaskDecomposition: %s", e)
+            return [{"task_type": "error", "params": {"message": "Failed to decompose request: Invalid structured output from LLM"}}]
+        except Exception as e:
+            logger.error("Unexpected error during task decomposition: %s", e)
+            return [{"task_type": "error", "params": {"message": f"Failed to decompose request: {str(e)}"}}]
+
+    async def adecompose_request(self, request: dict, available_tools: list[dict]) -> list[dict]:
+        """
+        Async variant of decompose_request, so callers can overlap many
+        decompositions with asyncio.gather. Shares the same cache and error
+        fallbacks as the sync path.
+        """
+        rule_tasks = self._apply_rule(request)
+        if rule_tasks is not None:
+            return rule_tasks
+
+        cache_key = self._cache_key(request, available_tools)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        try:
+            tools_str = self._tools_str(available_tools)
+            request_str = json_utils.dumps(request)
+
+            inputs = {"request": request_str, "available_tools": tools_str}
+            result = await self._avalidated(await self._ainvoke_structured(inputs), inputs, available_tools)
+            tasks = _intern_tasks([task.model_dump() for task in result.tasks])
+            self._cache[cache_key] = tasks
+            return tasks
+        except ValueError as e: # Covers pydantic validation and decode errors alike
+            logger.warning("Invalid structured output in TaskDecomposition: %s", e)
+            return [{"task_type": "error", "params": {"message": "Failed to decompose request: Invalid structured output from LLM"}}]
         except Exception as e:
-            print(f"An unexpected error occurred during task decomposition: {e}")
+            logger.error("Unexpected error during task decomposition: %s", e)
             return [{"task_type": "error", "params": {"message": f"Failed to decompose request: {str(e)}"}}]
 
+    async def astream_decompose(self, request: dict, available_tools: list[dict]):
+        """
+        Streams the decomposition for a request, yielding each task dict as
+        soon as its closing brace arrives instead of waiting for the full
+        response. This lets downstream agents start executing the first tasks
+        while later ones are still being generated. Rule-decomposable intents
+        yield their tasks immediately; callers that need a plain list should
+        use decompose_request instead.
+        """
+        rule_tasks = self._apply_rule(request)
+        if rule_tasks is not None:
+            for task in rule_tasks:
+                yield task
+            return
+
+        # Streaming needs the raw token stream, so this path formats the
+        # prompt directly against the base LLM rather than the
+        # structured-output chain.
+        prompt_text = self.prompt_template.format(
+            request=json_utils.dumps(request),
+            available_tools=self._tools_str(available_tools)
+        )
+        parser = _IncrementalTaskParser()
+        # Tasks already handed to the caller can't be retried, so invalid
+        # task_types are dropped here instead of triggering a correction pass.
+        valid = _valid_task_prefixes(available_tools)
+        async for chunk in self.llm.astream(prompt_text):
+            text = getattr(chunk, "content", "") or ""
+            if not isinstance(text, str):
+                text = "".join(part for part in text if isinstance(part, str))
+            for task in parser.feed(text):
+                task_type = task.get("task_type", "")
+                if task_type != "error" and task_type.split(".", 1)[0] not in valid:
+                    logger.warning("Skipping streamed task with invalid task_type: %s", task_type)
+                    continue
+                yield _intern_task(task)
+
+    async def adecompose_many(self, requests: list[dict], available_tools: list[dict],
+                              max_concurrency: int = 32) -> list[list[dict]]:
+        """
+        Decomposes many requests concurrently. Each request keeps the
+        per-request caching and error fallbacks of adecompose_request; the LLM
+        round-trips are pipelined instead of running back-to-back, with at
+        most max_concurrency in flight at a time. Requests with the same
+        fingerprint are decomposed once and the result is fanned back out to
+        every occurrence, so exact repeats within a batch cost a single LLM
+        call.
+        """
+        keys = [self._cache_key(request, available_tools) for request in requests]
+        first_index: dict[str, int] = {}
+        for i, key in enumerate(keys):
+            first_index.setdefault(key, i)
+        unique_indices = sorted(first_index.values())
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _bounded(request: dict) -> list[dict]:
+            async with semaphore:
+                return await self.adecompose_request(request, available_tools)
+
+        unique_results = await asyncio.gather(
+            *(_bounded(requests[i]) for i in unique_indices)
+        )
+        results_by_key = {keys[i]: result for i, result in zip(unique_indices, unique_results)}
+        # Shallow-copy per slot so callers mutating one result don't affect
+        # its duplicates.
+        return [list(results_by_key[key]) for key in keys]
+
+    def decompose_many(self, requests: list[dict], available_tools: list[dict]) -> list[list[dict]]:
+        """
+        Synchronous wrapper around adecompose_many for callers without an
+        event loop.
+        """
+        return asyncio.run(self.adecompose_many(requests, available_tools))
+
 if __name__ == "__main__":
     # Example Usage
     decomposer = TaskDecomposition()